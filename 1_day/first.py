@@ -1,3 +1,14 @@
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
 def load_and_format_data():
     """ Loads and format the data """
     with open("data.txt", "r") as input_file:
@@ -27,10 +38,279 @@ def get_three_top_max(data):
     return sum(max_three)
 
 
-def main():
-    data = load_and_format_data()
-    print(f"Max sum is {get_max(data)}")
-    print(f"Sum of three biggest is {get_three_top_max(data)}")
+def push_top_k(top_k, k, sum_val):
+    """ Pushes a sum into a bounded min-heap holding the k highest sums seen so far """
+    if len(top_k) < k:
+        heapq.heappush(top_k, sum_val)
+
+    elif top_k[0] < sum_val:
+        heapq.heapreplace(top_k, sum_val)
+
+
+def top_k_results(top_k):
+    """ Returns the max sum and the sum of the k highest sums from the heap, (0, 0) if there is no group """
+    if not top_k:
+        return 0, 0
+
+    return max(top_k), sum(top_k)
+
+
+def build_top_k(lines, k=3):
+    """ Builds the min-heap of the k highest sums from an iterable of lines (O(k) memory) """
+    top_k = []
+    current_sum = 0
+    in_group = False
+
+    for line in lines:
+        line = line.strip()
+
+        # Empty line: end of the current group
+        if not line:
+            if in_group:
+                push_top_k(top_k, k, current_sum)
+            current_sum = 0
+            in_group = False
+
+        else:
+            current_sum += int(line)
+            in_group = True
+
+    # Last group (no blank line at the end of the file)
+    if in_group:
+        push_top_k(top_k, k, current_sum)
+
+    return top_k
+
+
+def stream_top_k(input_file, k=3):
+    """
+        Single pass over an opened file: returns the max sum and the sum of the k highest sums,
+        without ever keeping the groups in memory (O(k) memory)
+    """
+    return top_k_results(build_top_k(input_file, k))
+
+
+def find_group_boundary(input_file, position, file_size, block_size=1 << 16):
+    """ Moves a byte position forward to the start of the next group (just after a blank line) """
+    if position <= 0:
+        return 0
+
+    # Start one byte before, in case the position is right in the middle of a "\n\n"
+    input_file.seek(position - 1)
+    offset = position - 1
+    previous = b""
+
+    while offset < file_size:
+        block = previous + input_file.read(block_size)
+        found = block.find(b"\n\n")
+
+        if found != -1:
+            return offset - len(previous) + found + 2
+
+        offset += len(block) - len(previous)
+        previous = block[-1:]
+
+    return file_size
+
+
+def read_lines_until(input_file, end):
+    """ Yields the lines of an opened file until a byte position (which must be the start of a line) """
+    while input_file.tell() < end:
+        line = input_file.readline()
+
+        if not line:
+            break
+
+        yield line
+
+
+def chunk_top_k(args):
+    """ Worker: computes the local top k of the groups in a byte range of the file """
+    file_name, start, end, k = args
+
+    with open(file_name, "rb") as input_file:
+        input_file.seek(start)
+
+        return build_top_k(read_lines_until(input_file, end), k)
+
+
+def parallel_top_k(file_name="data.txt", k=3, nb_workers=None):
+    """
+        Splits the file in byte ranges aligned on blank lines, computes a local top k for each of them
+        in a process pool, and merges them. Returns the max sum and the sum of the k highest sums
+    """
+    nb_workers = nb_workers or os.cpu_count() or 1
+    file_size = os.path.getsize(file_name)
+    chunk_size = max(file_size // nb_workers, 1)
+
+    with open(file_name, "rb") as input_file:
+        boundaries = [find_group_boundary(input_file, i * chunk_size, file_size) for i in range(nb_workers)]
+
+    boundaries = sorted(set(boundaries + [file_size]))
+    tasks = [(file_name, start, end, k) for start, end in zip(boundaries, boundaries[1:])]
+
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+        local_tops = list(executor.map(chunk_top_k, tasks))
+
+    top_k = heapq.nlargest(k, (x for local_top in local_tops for x in local_top))
+
+    return top_k_results(top_k)
+
+
+class CalorieFollower:
+    """
+        Keeps the running top k of an append-only calorie file, and only reads the bytes
+        appended since the last update
+    """
+    def __init__(self, file_name="data.txt", k=3):
+        self.file_name = file_name
+        self.k = k
+        self.offset = 0
+        self.top_k = []
+        self.current_sum = 0
+        self.in_group = False
+        # Bytes after the last line break (last line still being written, or without a final line break)
+        self.pending = b""
+
+    def update(self):
+        """ Reads the newly appended complete lines and updates the running top k """
+        with open(self.file_name, "rb") as input_file:
+            input_file.seek(self.offset)
+            new_data = input_file.read()
+
+        # Only consume complete lines, the last one may still be being written
+        last_line_break = new_data.rfind(b"\n")
+        self.pending = new_data[last_line_break + 1:]
+
+        if last_line_break == -1:
+            return self.get_results()
+
+        self.offset += last_line_break + 1
+
+        for line in new_data[:last_line_break].split(b"\n"):
+            line = line.strip()
+
+            if not line:
+                if self.in_group:
+                    push_top_k(self.top_k, self.k, self.current_sum)
+                self.current_sum = 0
+                self.in_group = False
+
+            else:
+                self.current_sum += int(line)
+                self.in_group = True
+
+        return self.get_results()
+
+    def get_results(self):
+        """
+            Returns the max sum and the sum of the k highest sums, counting the group being written
+            (with the last line as a provisional value until its line break arrives)
+        """
+        top_k = list(self.top_k)
+        pending = self.pending.strip()
+
+        if pending.isdigit():
+            push_top_k(top_k, self.k, self.current_sum + int(pending))
+
+        elif self.in_group:
+            push_top_k(top_k, self.k, self.current_sum)
+
+        return top_k_results(top_k)
+
+    def follow(self, interval=1.0):
+        """ Prints the results each time the file grows """
+        last_results = None
+
+        while True:
+            results = self.update()
+
+            if results != last_results:
+                print(f"Max sum is {results[0]}, sum of {self.k} biggest is {results[1]}")
+                last_results = results
+
+            time.sleep(interval)
+
+
+def load_as_array(file_name="data.txt"):
+    """
+        Loads the data into a flat int64 array of calories and an array of offsets
+        (index of the first value of each group in the flat array)
+    """
+    if np is None:
+        raise ImportError("The numpy engine requires numpy to be installed")
+
+    with open(file_name, "rb") as input_file:
+        contents = input_file.read().replace(b"\r", b"").strip(b"\n")
+
+    values = np.fromstring(contents.decode(), dtype=np.int64, sep=" ")
+
+    # Find the empty lines from the positions of the line breaks
+    raw = np.frombuffer(contents, dtype=np.uint8)
+    line_breaks = np.flatnonzero(raw == ord("\n"))
+    line_starts = np.concatenate(([0], line_breaks + 1))
+    line_ends = np.concatenate((line_breaks, [len(raw)]))
+    not_empty = line_ends > line_starts
+
+    # A group starts on a non empty line that follows an empty one (or on the first line)
+    starts_group = not_empty.copy()
+    starts_group[1:] &= ~not_empty[:-1]
+
+    # Index of each non empty line among the values
+    value_idx = np.cumsum(not_empty) - 1
+    offsets = value_idx[starts_group]
+
+    return values, offsets
+
+def get_group_sums_array(values, offsets):
+    """ Returns the sum of each stack of calories (array engine) """
+    return np.add.reduceat(values, offsets)
+
+def get_max_array(values, offsets):
+    """ Returns the max sum for each stack of calories (array engine), 0 if there is no group """
+    if not len(offsets):
+        return 0
+
+    return int(get_group_sums_array(values, offsets).max())
+
+def get_top_k_max_array(values, offsets, k=3):
+    """ Returns the sum of the k highest calories count (array engine), 0 if there is no group """
+    if not len(offsets):
+        return 0
+
+    sums = get_group_sums_array(values, offsets)
+
+    if k >= len(sums):
+        return int(sums.sum())
+
+    return int(np.partition(sums, len(sums) - k)[-k:].sum())
+
+
+def main(engine="lists"):
+    if engine == "lists":
+        data = load_and_format_data()
+        print(f"Max sum is {get_max(data)}")
+        print(f"Sum of three biggest is {get_three_top_max(data)}")
+
+    elif engine == "streaming":
+        with open("data.txt", "r") as input_file:
+            max_sum, top_three_sum = stream_top_k(input_file, 3)
+
+        print(f"Max sum is {max_sum}")
+        print(f"Sum of three biggest is {top_three_sum}")
+
+    elif engine == "numpy":
+        values, offsets = load_as_array()
+        print(f"Max sum is {get_max_array(values, offsets)}")
+        print(f"Sum of three biggest is {get_top_k_max_array(values, offsets)}")
+
+    elif engine == "parallel":
+        max_sum, top_three_sum = parallel_top_k("data.txt", 3)
+        print(f"Max sum is {max_sum}")
+        print(f"Sum of three biggest is {top_three_sum}")
+
+    elif engine == "follow":
+        CalorieFollower("data.txt", 3).follow()
 
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
+from collections import Counter
+
 CORRESPONDING = {"X": "A", "Y": "B", "Z": "C"}
 
 WIN = {"A": "Y", "B": "Z", "C": "X"} 
@@ -5,6 +7,13 @@ LOSE = {"A": "Z", "B": "X", "C": "Y"}
 DRAW = {"A": "X", "B": "Y", "C": "Z"} 
 MUST = {"X": LOSE, "Y": DRAW, "Z": WIN}
 
+# Only 9 different rounds exist: precompute their scores for both parts
+# (shape: X 1, Y 2, Z 3 + outcome: lose 0, draw 3, win 6)
+PAIRS = [(opponent, you) for opponent in "ABC" for you in "XYZ"]
+SCORE_TABLE = {(opponent, you): "XYZ".index(you) + 1 + 3 * [LOSE[opponent], DRAW[opponent], WIN[opponent]].index(you)
+               for opponent, you in PAIRS}
+SNEAKY_SCORE_TABLE = {(opponent, you): SCORE_TABLE[(opponent, MUST[you][opponent])] for opponent, you in PAIRS}
+
 def load_and_format_data():
     """ Loads the data into a list of strings """
     with open("data.txt", "r") as input_file:
@@ -48,12 +57,28 @@ def get_sneaky_score(data):
 
     return score
 
+def count_pairs(file_name="data.txt"):
+    """ Counts the number of occurrences of each round in a single pass over the raw bytes """
+    with open(file_name, "rb") as input_file:
+        counts = Counter(input_file.read().replace(b"\r", b"").split(b"\n"))
+
+    return {pair: counts[f"{pair[0]} {pair[1]}".encode()] for pair in PAIRS}
+
+def get_score_from_counts(counts, score_table=SCORE_TABLE):
+    """ Dot product between the number of occurrences of each round and its score """
+    return sum(nb * score_table[pair] for pair, nb in counts.items())
+
+
+def main(engine="lists"):
+    if engine == "lists":
+        data = load_and_format_data()
+        print(f"Score is {get_score(data)}")
+        print(f"Sneaky score is {get_sneaky_score(data)}")
 
-            
-def main():
-    data = load_and_format_data()
-    print(f"Score is {get_score(data)}")
-    print(f"Sneaky score is {get_sneaky_score(data)}")
+    elif engine == "histogram":
+        counts = count_pairs()
+        print(f"Score is {get_score_from_counts(counts)}")
+        print(f"Sneaky score is {get_score_from_counts(counts, SNEAKY_SCORE_TABLE)}")
 
 
 if __name__ == "__main__":
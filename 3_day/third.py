@@ -40,11 +40,81 @@ def sum_priorities(data):
     return score
         
 
-def main():
-    data = load_and_format_data()
-    print(f"Summed priorities: {sum_priorities(data)}")
-    new_data = reformat_data(data)
-    print(f"Summed badges priorities: {sum_priorities(new_data)}")
+# For each byte, the bit corresponding to its priority (bit 0 for 'a', ..., bit 51 for 'Z'), 0 if not a letter
+PRIORITY_BITS = [0] * 256
+for letter in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ":
+    PRIORITY_BITS[ord(letter)] = 1 << (get_priority(letter) - 1)
+
+def get_mask(items):
+    """ Encodes a compartment (or a rucksack) as a 52 bits integer, one bit per priority """
+    mask = 0
+    for item in items.encode() if isinstance(items, str) else items:
+        mask |= PRIORITY_BITS[item]
+
+    return mask
+
+def get_misplaced_priority(comp):
+    """ Intersects the masks of multiple compartments and returns the priority of the common item """
+    common = -1
+    for single in comp:
+        common &= get_mask(single)
+
+    return common.bit_length()
+
+def sum_priorities_bitmask(data):
+    score = 0
+    for comp in data:
+        score += get_misplaced_priority(comp)
+
+    return score
+
+
+def stream_priorities(file_name="data.txt"):
+    """
+        Computes both parts in a single pass over the file, without building the halves and groups lists:
+        halves for part 1, and a rolling window of three rucksacks for part 2
+    """
+    score = 0
+    badges_score = 0
+    group_mask = -1
+    group_size = 0
+
+    with open(file_name, "rb") as input_file:
+        for line in input_file:
+            line = memoryview(line.rstrip())
+            half = len(line) // 2
+
+            # Slicing a memoryview does not copy the bytes
+            score += (get_mask(line[:half]) & get_mask(line[half:])).bit_length()
+
+            group_mask &= get_mask(line)
+            group_size += 1
+
+            if group_size == 3:
+                badges_score += group_mask.bit_length()
+                group_mask = -1
+                group_size = 0
+
+    return score, badges_score
+
+
+def main(engine="sets"):
+    if engine == "sets":
+        data = load_and_format_data()
+        print(f"Summed priorities: {sum_priorities(data)}")
+        new_data = reformat_data(data)
+        print(f"Summed badges priorities: {sum_priorities(new_data)}")
+
+    elif engine == "bitmask":
+        data = load_and_format_data()
+        print(f"Summed priorities: {sum_priorities_bitmask(data)}")
+        new_data = reformat_data(data)
+        print(f"Summed badges priorities: {sum_priorities_bitmask(new_data)}")
+
+    elif engine == "streaming":
+        score, badges_score = stream_priorities()
+        print(f"Summed priorities: {score}")
+        print(f"Summed badges priorities: {badges_score}")
 
 
 if __name__ == "__main__":
@@ -1,3 +1,9 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
 def load_and_format_data():
     with open("data.txt", "r") as input_file:
         contents = input_file.read()
@@ -33,10 +39,111 @@ def get_overlapping(data, type="fully"):
 
     return nb_overlap
 
-def main():
-    data = load_and_format_data()
-    print(f"Number of fully overlapping ranges: {get_overlapping(data)}")
-    print(f"Number of partially overlapping ranges: {get_overlapping(data, 'partial')}")
+def load_as_array(file_name="data.txt"):
+    """ Loads the data into a (N, 4) int32 array (first start, first end, second start, second end) """
+    if np is None:
+        raise ImportError("The numpy engine requires numpy to be installed")
+
+    with open(file_name, "rb") as input_file:
+        contents = input_file.read().translate(bytes.maketrans(b",-", b"  "))
+
+    return np.fromstring(contents.decode(), dtype=np.int32, sep=" ").reshape(-1, 4)
+
+def get_overlapping_array(data):
+    """ Returns the number of fully and partially overlapping pairs (array engine) """
+    first_min = np.minimum(data[:, 0], data[:, 1])
+    first_max = np.maximum(data[:, 0], data[:, 1])
+    second_min = np.minimum(data[:, 2], data[:, 3])
+    second_max = np.maximum(data[:, 2], data[:, 3])
+
+    fully = ((first_min <= second_min) & (first_max >= second_max)) \
+        | ((second_min <= first_min) & (second_max >= first_max))
+    partial = (first_max >= second_min) & (second_max >= first_min)
+
+    return int(np.count_nonzero(fully)), int(np.count_nonzero(partial))
+
+class IntervalNode:
+    """ Node of the interval tree: intervals containing the center, and subtrees for the ones fully on each side """
+    def __init__(self, intervals):
+        endpoints = sorted(x for interval in intervals for x in interval[:2])
+        self.center = endpoints[len(endpoints) // 2]
+
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        self.by_start = sorted(here, key=lambda interval: interval[0])
+        self.by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        self.left = IntervalNode(left) if left else None
+        self.right = IntervalNode(right) if right else None
+
+
+class IntervalIndex:
+    """
+        Interval tree built once from the parsed data, to answer overlap and containment queries
+        on the sections assignments in O(log n + k). Results are (pair index, elf index in the pair) tuples
+    """
+    def __init__(self, data):
+        intervals = [(min(assignment), max(assignment), i, j)
+                     for i, pair in enumerate(data) for j, assignment in enumerate(pair)]
+        self.root = IntervalNode(intervals) if intervals else None
+
+    def overlapping(self, start, end):
+        """ Returns all the assignments that overlap the section range [start, end] """
+        found = []
+        queue = [self.root] if self.root else []
+
+        while queue:
+            node = queue.pop()
+
+            if end < node.center:
+                for interval in node.by_start:
+                    if interval[0] > end:
+                        break
+                    found.append(interval[2:])
+
+                if node.left:
+                    queue.append(node.left)
+
+            elif start > node.center:
+                for interval in node.by_end:
+                    if interval[1] < start:
+                        break
+                    found.append(interval[2:])
+
+                if node.right:
+                    queue.append(node.right)
+
+            else:
+                found.extend(interval[2:] for interval in node.by_start)
+
+                if node.left:
+                    queue.append(node.left)
+                if node.right:
+                    queue.append(node.right)
+
+        return found
+
+    def containing(self, section):
+        """ Returns all the assignments that contain a given section """
+        return self.overlapping(section, section)
+
+
+def main(engine="lists"):
+    if engine == "lists":
+        data = load_and_format_data()
+        print(f"Number of fully overlapping ranges: {get_overlapping(data)}")
+        print(f"Number of partially overlapping ranges: {get_overlapping(data, 'partial')}")
+
+    elif engine == "numpy":
+        fully, partial = get_overlapping_array(load_as_array())
+        print(f"Number of fully overlapping ranges: {fully}")
+        print(f"Number of partially overlapping ranges: {partial}")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 # each stack is a LIFO (Last In First Out)
 import queue
+from array import array
 from dataclasses import dataclass
 
 ASCII_COL_WIDTH = 3
@@ -30,19 +31,19 @@ class Dock:
         #     Stacks initialisation
         # ----------------------------
         nb_stacks = max([int(x) for x in deck_data[-1].split(" ") if x != ""])
-        self.stacks = [queue.LifoQueue() for i in range(nb_stacks)]
+        self.stacks = [self.new_stack() for i in range(nb_stacks)]
 
         # Insert from bottom to the top
         for i in range(len(deck_data) - 2, -1, -1):
             splitted_line = deck_data[i].split(" ")
 
             # easy case : crates for all stacks
-            if len(splitted_line) != 9:
-                splitted_line = reformat_splitted_string(deck_data[i])
+            if len(splitted_line) != nb_stacks:
+                splitted_line = reformat_splitted_string(deck_data[i], nb_stacks)
             
-            for s in range(9):
+            for s in range(nb_stacks):
                 if splitted_line[s] and not splitted_line[s].isspace():
-                    self.stacks[s].put(splitted_line[s][1])
+                    self.add_crate(s, splitted_line[s][1])
 
         # ----------------------------
         #  Stacks initialisation done 
@@ -52,6 +53,18 @@ class Dock:
             splitted_line = line.split(" ")
             self.moving_instr.append(MovingInstr(int(splitted_line[1]), int(splitted_line[3]), int(splitted_line[5])))
 
+    def new_stack(self):
+        """
+            Returns a new empty stack
+        """
+        return queue.LifoQueue()
+
+    def add_crate(self, stack_idx, crate):
+        """
+            Puts a crate on top of a stack (used during the initialisation)
+        """
+        self.stacks[stack_idx].put(crate)
+
     def run(self, put_order="regular"):
         """
             Apply the moving instructions in the MovingInstr list
@@ -84,6 +97,19 @@ class Dock:
 
         return crates_str
 
+    def get_stacks_as_lists(self):
+        """
+            Returns the stacks as lists (bottom to top)
+        """
+        return [list(stack.queue) for stack in self.stacks]
+
+    def solve_top_crates(self, put_order="regular"):
+        """
+            Returns the top crates after all the moving instructions, without running them
+            (see trace_top_crates)
+        """
+        return trace_top_crates(self.get_stacks_as_lists(), self.moving_instr, put_order)
+
     def print_stacks(self):
         """
             Prints the stacks (horizontally ¯\_(ツ)_/¯)
@@ -92,20 +118,237 @@ class Dock:
             print(f"{stack.queue}")
 
 
-def reformat_splitted_string(splitted_str):
+class ListDock(Dock):
+    """
+        Dock where each stack is a plain list (no lock taken on each put/get like the LifoQueue),
+        and where the crane moves all the crates of an instruction at once (a single slice and extend)
+    """
+    def new_stack(self):
+        """
+            Returns a new empty stack
+        """
+        return []
+
+    def add_crate(self, stack_idx, crate):
+        """
+            Puts a crate on top of a stack (used during the initialisation)
+        """
+        self.stacks[stack_idx].append(crate)
+
+    def run(self, put_order="regular"):
+        """
+            Apply the moving instructions in the MovingInstr list
+        """
+        for instr in self.moving_instr:
+            apply_instr(self.stacks, instr, put_order)
+
+    def get_top_crates(self):
+        """
+            Returns a string composed of the concatenated top crates names
+        """
+        return "".join(stack[-1] for stack in self.stacks)
+
+    def get_stacks_as_lists(self):
+        """
+            Returns the stacks as lists (bottom to top)
+        """
+        return self.stacks
+
+    def print_stacks(self):
+        """
+            Prints the stacks (horizontally ¯\_(ツ)_/¯)
+        """
+        for stack in self.stacks:
+            print(f"{stack}")
+
+
+def apply_instr(stacks, instr, put_order="regular"):
+    """
+        Applies a single moving instruction on stacks stored as lists
+    """
+    move_crates(stacks, instr.quantity, instr.origin, instr.destination, put_order)
+
+
+def move_crates(stacks, quantity, origin, destination, put_order="regular"):
+    """
+        Moves crates between stacks stored as lists (numbered from 1), with a single slice and extend
+    """
+    # Crates moved one at a time on the same stack: nothing changes
+    if origin == destination:
+        return
+
+    origin_stack = stacks[origin - 1]
+
+    if quantity > len(origin_stack):
+        raise ValueError(f"Cannot move {quantity} crates from stack {origin}, it only has {len(origin_stack)}")
+
+    moved = origin_stack[len(origin_stack) - quantity:]
+    del origin_stack[len(origin_stack) - quantity:]
+
+    # One crate at a time: the moved crates end up in the reverse order
+    if put_order == "regular":
+        moved.reverse()
+
+    stacks[destination - 1].extend(moved)
+
+
+class DockReplay:
+    """
+        Stores a snapshot of the stacks every checkpoint_interval instructions, to get the state of the Dock
+        after any instruction by restoring the closest snapshot and replaying the remaining instructions.
+        A smaller interval uses more memory but answers faster
+    """
+    def __init__(self, dock, put_order="regular", checkpoint_interval=100):
+        self.moving_instr = dock.moving_instr
+        self.put_order = put_order
+        self.checkpoint_interval = checkpoint_interval
+        self.snapshots = []
+
+        stacks = [list(stack) for stack in dock.get_stacks_as_lists()]
+
+        for i, instr in enumerate(self.moving_instr):
+            if i % checkpoint_interval == 0:
+                self.snapshots.append(self.compact(stacks))
+            apply_instr(stacks, instr, put_order)
+
+        if len(self.moving_instr) % checkpoint_interval == 0:
+            self.snapshots.append(self.compact(stacks))
+
+    @staticmethod
+    def compact(stacks):
+        """ Snapshot of the stacks, as one string per stack (bottom to top) """
+        return tuple("".join(stack) for stack in stacks)
+
+    def get_stacks(self, instr_idx):
+        """ Returns the stacks (as lists) after the first instr_idx instructions have been applied """
+        if not 0 <= instr_idx <= len(self.moving_instr):
+            raise IndexError(f"Instruction index {instr_idx} out of range")
+
+        snapshot_idx = instr_idx // self.checkpoint_interval
+        stacks = [list(stack) for stack in self.snapshots[snapshot_idx]]
+
+        for instr in self.moving_instr[snapshot_idx * self.checkpoint_interval:instr_idx]:
+            apply_instr(stacks, instr, self.put_order)
+
+        return stacks
+
+    def get_stack(self, instr_idx, stack_number):
+        """ Returns a single stack (numbered from 1, like in the instructions) after instr_idx instructions """
+        return self.get_stacks(instr_idx)[stack_number - 1]
+
+    def get_top_crates(self, instr_idx):
+        """ Returns the top crates after instr_idx instructions (empty stacks are skipped) """
+        return "".join(stack[-1] for stack in self.get_stacks(instr_idx) if stack)
+
+
+def trace_top_crates(stacks, moving_instr, put_order="regular"):
+    """
+        Finds the final top crates by starting from the final top position of each stack, and walking
+        the moving instructions backwards to find which initial crate ends up there.
+        Costs O(stacks x moves), whatever the quantities of crates moved
+    """
+    # Final heights of the stacks (forward pass on the quantities only)
+    heights = [len(stack) for stack in stacks]
+    for instr in moving_instr:
+        heights[instr.origin - 1] -= instr.quantity
+        heights[instr.destination - 1] += instr.quantity
+
+    crates_str = ""
+
+    for s, height in enumerate(heights):
+        # Empty stack at the end: no top crate
+        if height == 0:
+            continue
+
+        # Position as (stack index, depth from the top of the stack)
+        current_stack, depth = s, 0
+
+        for instr in reversed(moving_instr):
+            origin, destination = instr.origin - 1, instr.destination - 1
+
+            # Crates moved one at a time on the same stack: nothing changes
+            if origin == destination:
+                continue
+
+            if current_stack == destination:
+                # The crate was moved by this instruction
+                if depth < instr.quantity:
+                    current_stack = origin
+                    if put_order == "regular":
+                        depth = instr.quantity - 1 - depth
+
+                # The crate was under the moved ones
+                else:
+                    depth -= instr.quantity
+
+            elif current_stack == origin:
+                # The moved crates were above this one
+                depth += instr.quantity
+
+        crates_str += stacks[current_stack][-1 - depth]
+
+    return crates_str
+
+
+def reformat_splitted_string(splitted_str, nb_stacks=9):
     """
         Correctly formats a string when there are some empty spots on one or more stacks
     """
     new_splitted_line = []
     offset = 0
 
-    for i in range(9):
+    for i in range(nb_stacks):
         new_splitted_line.append(splitted_str[offset + i * ASCII_COL_WIDTH:offset + (i + 1) * ASCII_COL_WIDTH])
         offset += 1
 
     return new_splitted_line
 
 
+def parse_dock(file_name="data.txt"):
+    """
+        Single pass parser for docks of any width: the number of stacks is read from the labels line,
+        the crates are extracted with a fixed stride (column 1 + 4 * i), and the moving instructions
+        are stored in a flat integer array (quantity, origin, destination, quantity, ...)
+    """
+    rows = []
+    moves = array("q")
+    nb_stacks = None
+
+    with open(file_name, "rb") as input_file:
+        for line in input_file:
+            # Labels line: the deck is over
+            if line.lstrip()[:1].isdigit():
+                nb_stacks = len(line.split())
+                break
+
+            rows.append(line[1::ASCII_COL_WIDTH + 1])
+
+        for line in input_file:
+            if line.startswith(b"move"):
+                splitted_line = line.split()
+                moves.extend((int(splitted_line[1]), int(splitted_line[3]), int(splitted_line[5])))
+
+    if nb_stacks is None:
+        raise ValueError(f"No stacks labels line found in {file_name}")
+
+    # Insert from bottom to the top
+    stacks = [[] for _ in range(nb_stacks)]
+    for row in reversed(rows):
+        for s, crate in enumerate(row[:nb_stacks]):
+            if crate != ord(" "):
+                stacks[s].append(chr(crate))
+
+    return stacks, moves
+
+
+def run_moves(stacks, moves, put_order="regular"):
+    """
+        Applies the moving instructions stored in a flat integer array (see parse_dock) on stacks stored as lists
+    """
+    for i in range(0, len(moves), 3):
+        move_crates(stacks, moves[i], moves[i + 1], moves[i + 2], put_order)
+
+
 def load_and_format_data():
     """
         Loads the data in two different lists: one for the deck data, one for the moving instructions 
@@ -135,15 +378,30 @@ def load_and_format_data():
 
     return dock_data, move_data
 
-def main():
-    dock_data, move_data = load_and_format_data()
-    dock = Dock(dock_data, move_data)
-    dock.run(put_order="regular")
-    print(f"Final top crates (regular order): {dock.get_top_crates()}")
-
-    dock_same = Dock(dock_data, move_data)
-    dock_same.run(put_order="same")
-    print(f"Final top crates (same order): {dock_same.get_top_crates()}")
+def main(dock_class=Dock, engine="simulation"):
+    if engine == "simulation":
+        dock_data, move_data = load_and_format_data()
+        dock = dock_class(dock_data, move_data)
+        dock.run(put_order="regular")
+        print(f"Final top crates (regular order): {dock.get_top_crates()}")
+
+        dock_same = dock_class(dock_data, move_data)
+        dock_same.run(put_order="same")
+        print(f"Final top crates (same order): {dock_same.get_top_crates()}")
+
+    elif engine == "backward":
+        dock_data, move_data = load_and_format_data()
+        dock = dock_class(dock_data, move_data)
+        print(f"Final top crates (regular order): {dock.solve_top_crates(put_order='regular')}")
+        print(f"Final top crates (same order): {dock.solve_top_crates(put_order='same')}")
+
+    elif engine == "compact":
+        initial_stacks, moves = parse_dock()
+
+        for put_order in ("regular", "same"):
+            stacks = [list(stack) for stack in initial_stacks]
+            run_moves(stacks, moves, put_order)
+            print(f"Final top crates ({put_order} order): {''.join(stack[-1] for stack in stacks)}")
 
 
 if __name__ == "__main__":
@@ -1,3 +1,11 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
 def has_diff_letters(buffer):
     """
         Checks if a string is only made of unique characters by comparing the size of the string vs the size of the string as a set
@@ -26,6 +34,133 @@ def find_marker_index(data, buffer_size=4):
 
     return -1
 
+
+
+def find_marker_index_fast(data, buffer_size=4):
+    """
+        Finds the marker index in O(n) for any buffer size: keeps the last index where each character
+        was seen, and moves the start of the window just after a duplicate when one is found.
+        Works on strings and bytes
+    """
+    last_seen = {}
+    window_start = 0
+
+    for i, l in enumerate(data):
+        previous = last_seen.get(l, -1)
+
+        # Duplicate in the current window: start again after it
+        if previous >= window_start:
+            window_start = previous + 1
+
+        last_seen[l] = i
+
+        if i - window_start + 1 == buffer_size:
+            return i + 1
+
+    return -1
+
+
+def scan_markers(source, buffer_sizes=(4, 14), chunk_size=1 << 16):
+    """
+        Finds the markers for several buffer sizes in a single pass over a file path or a binary stream,
+        reading it by chunks (constant memory). The window states are kept across the chunks.
+        Returns a dictionary {buffer_size: marker index (-1 if not found)}
+    """
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as input_file:
+            return scan_markers(input_file, buffer_sizes, chunk_size)
+
+    # Last index where each byte was seen
+    last_seen = [-1] * 256
+    # The window start only depends on the duplicates seen so far, so it is the same for all the sizes:
+    # a marker of a given size is found the first time the current window reaches that size
+    window_start = 0
+    pending = sorted(set(buffer_sizes), reverse=True)
+    markers = {size: -1 for size in buffer_sizes}
+    offset = 0
+
+    while pending:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+
+        for i, l in enumerate(chunk, offset):
+            previous = last_seen[l]
+            last_seen[l] = i
+
+            # Duplicate in the current window: start again after it
+            if previous >= window_start:
+                window_start = previous + 1
+
+            # The window grows by one character at most, so it reaches the smallest pending size exactly
+            elif i - window_start + 1 == pending[-1]:
+                markers[pending.pop()] = i + 1
+
+                if not pending:
+                    break
+
+        offset += len(chunk)
+
+    return markers
+
+
+def timed_scan(args):
+    """
+        Worker: scans a single file and returns its markers, the time it took and the error message
+        (None if the scan succeeded, and markers is None if it failed)
+    """
+    file_name, buffer_sizes = args
+    start = time.perf_counter()
+
+    try:
+        markers = scan_markers(file_name, buffer_sizes)
+        error = None
+
+    # One bad capture must not abort the whole batch
+    except OSError as e:
+        markers = None
+        error = str(e)
+
+    return file_name, markers, time.perf_counter() - start, error
+
+
+def list_signal_files(source):
+    """ Lists the files to process from a directory (all its files) or a manifest (one path per line) """
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if os.path.isfile(os.path.join(source, name)))
+
+    base_dir = os.path.dirname(source)
+    with open(source, "r") as manifest:
+        return [os.path.join(base_dir, line.strip()) for line in manifest if line.strip()]
+
+
+def batch_find_markers(source, output_file, buffer_sizes=(4, 14), nb_workers=None, chunksize=16):
+    """
+        Finds the markers of many signal files (a directory or a manifest) with a pool of processes,
+        and writes the results and the time spent on each file in a single CSV or JSONL file
+        (depending on the extension of output_file)
+    """
+    tasks = [(file_name, tuple(buffer_sizes)) for file_name in list_signal_files(source)]
+
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+        results = list(executor.map(timed_scan, tasks, chunksize=chunksize))
+
+    with open(output_file, "w", newline="") as output:
+        if output_file.endswith(".csv"):
+            writer = csv.writer(output)
+            writer.writerow(["file"] + [f"marker_{size}" for size in buffer_sizes] + ["seconds", "error"])
+
+            for file_name, markers, seconds, error in results:
+                marker_values = [markers[size] for size in buffer_sizes] if markers else [""] * len(buffer_sizes)
+                writer.writerow([file_name] + marker_values + [f"{seconds:.6f}", error or ""])
+
+        else:
+            for file_name, markers, seconds, error in results:
+                output.write(json.dumps({"file": file_name, "markers": markers, "seconds": seconds, "error": error}) + "\n")
+
+    return results
+
         
 
 def load_and_format_data():
@@ -37,10 +172,25 @@ def load_and_format_data():
 
     return contents
 
-def main():
+def main_streaming():
+    markers = scan_markers("data.txt", (4, 14))
+    print(f"Marker found at {markers[4]}")
+    print(f"State-of-the-art marker found at {markers[14]}")
+
+def main_batch(source, output_file="markers.jsonl"):
+    results = batch_find_markers(source, output_file)
+    total_time = sum(result[2] for result in results)
+    nb_errors = sum(1 for result in results if result[3] is not None)
+    print(f"{len(results)} files processed ({total_time:.3f}s of scanning, {nb_errors} errors), results written in {output_file}")
+
+def main(find_marker=find_marker_index):
     data = load_and_format_data()
-    print(f"Marker found at {find_marker_index(data)}")
-    print(f"State-of-the-art marker found at {find_marker_index(data, buffer_size=14)}")
+    print(f"Marker found at {find_marker(data)}")
+    print(f"State-of-the-art marker found at {find_marker(data, buffer_size=14)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Batch mode: sixth.py --batch <directory or manifest> [output file (.csv or .jsonl)]
+    if len(sys.argv) > 2 and sys.argv[1] == "--batch":
+        main_batch(*sys.argv[2:4])
+    else:
+        main()
\ No newline at end of file
@@ -1,12 +1,30 @@
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import List, Type
+from typing import Dict, List, Type
 from operator import itemgetter
+from bisect import bisect_left
+from itertools import accumulate
+from functools import cached_property
+from array import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
 
 
 TOTAL_AVAILABLE_SPACE = 70000000
 REQUIRED_SPACE        = 30000000
 
+# Binary snapshot of an ArrayHierarchy: magic, version, little endian flag, sha256 of the source, number of nodes,
+# length of the names table
+SNAPSHOT_MAGIC   = b"AOC7"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER  = struct.Struct("<4sHH32sQQ")
+SNAPSHOT_OFFSET  = 64
+# Bytes per node: parent, size and name id (int64), is_dir (int8)
+SNAPSHOT_NODE_SIZE = 25
+
 
 class LineType(Enum):
     COMMAND = 0
@@ -33,6 +51,10 @@ class File(FileNode):
 class Folder(FileNode):
     """ Dataclass for a folder (name, size and content) """
     content: List = field(default_factory=list) 
+    # Index of the content by name, kept in sync by Hierarchy.add_to_folder
+    children: Dict = field(default_factory=dict, repr=False)
+    # True once the content of the folder has been listed (ls)
+    listed: bool = False
     size = 0
 
     def print_content(self) -> None:
@@ -48,9 +70,15 @@ class Hierarchy:
         self.current_root = self.tree[0]
 
     def add_to_folder(self, to_add: Type[FileNode]) -> None:
-        """ Adds a file or a folder to the current current root (different from the tree root) """
+        """ Adds a file or a folder to the current current root (different from the tree root), and adds its size to all its parents """
         to_add.parent = self.current_root
         self.current_root.content.append(to_add)
+        self.current_root.children[to_add.name] = to_add
+
+        parent = self.current_root
+        while parent is not None:
+            parent.size += to_add.size
+            parent = parent.parent
 
     def find_folder_from_current(self, folder_name: str) -> Folder:
         """ Finds and returns a folder from a given name in the current root """
@@ -58,30 +86,26 @@ class Hierarchy:
 
     def find_folder(self, folder_name: str, current_folder: Folder = None) -> Folder:
         """ Finds and returns a folder in a given folder """
-        
-        for filenode in current_folder.content:
-            if isinstance(filenode, Folder):
-                if filenode.name == folder_name:
-                    return filenode
+        filenode = current_folder.children.get(folder_name)
 
-    def compute_all_sizes(self):
-        """ Call the recursive method that computes the sizes of all folders with the right parameters """
-        self.recursive_size(self.tree[0], 0)
-
-    def recursive_size(self, current_folder: Folder, size: int) -> int:
-        """ Computes the sizes for everything in the hierarchy (recursive) """
-        
-        new_size = 0
+        if isinstance(filenode, Folder):
+            return filenode
 
-        for filenode in current_folder.content:
-            if isinstance(filenode, Folder):
-                self.recursive_size(filenode, new_size)
+    def compute_all_sizes(self):
+        """
+            Recomputes the sizes of all folders with an iterative post-order traversal (no recursion limit).
+            Only needed after a bulk load, the sizes are kept up to date by add_to_folder
+        """
+        folders = [self.tree[0]]
+        idx = 0
 
-            new_size += filenode.size
+        # Pre-order list of the folders: each folder comes before its subfolders
+        while idx < len(folders):
+            folders.extend(filenode for filenode in folders[idx].content if isinstance(filenode, Folder))
+            idx += 1
 
-        current_folder.size = new_size
-        
-        return new_size
+        for folder in reversed(folders):
+            folder.size = sum(filenode.size for filenode in folder.content)
 
     def get_sum_size_above_threshold(self, threshold: int = 100000) -> int:
         """ Computes the sum of all the folders in the tree that have a size equal or above a given threshold """
@@ -111,24 +135,68 @@ class Hierarchy:
 
         queue = [self.tree[0]]
 
-        folders_and_size = {}
+        # List and not a dictionary: folders in different paths can have the same name
+        folders_and_size = []
 
         while queue:
             current_filenode = queue.pop()
             
             if isinstance(current_filenode, Folder):
                 if current_filenode.size >= min_space_to_free:
-                    folders_and_size[current_filenode.name] = current_filenode.size
+                    folders_and_size.append((current_filenode.name, current_filenode.size))
 
                 for sub in current_filenode.content:
                     queue.append(sub)
 
-        return min(folders_and_size.items(), key=itemgetter(1))
+        return min(folders_and_size, key=itemgetter(1))
 
     def print(self) -> None:
         """ Ahahah nope """
         pass
 
+
+
+class SizeIndex:
+    """
+        Sorted array of the sizes of all the folders of a Hierarchy (with their paths) and its prefix sums,
+        built once to answer threshold and deletion queries in O(log n)
+    """
+    def __init__(self, hierarchy: Hierarchy):
+        self.root_size = hierarchy.tree[0].size
+        folders = []
+        queue = [(hierarchy.tree[0], "/")]
+
+        while queue:
+            folder, path = queue.pop()
+            folders.append((folder.size, path))
+
+            for filenode in folder.content:
+                if isinstance(filenode, Folder):
+                    queue.append((filenode, f"{path.rstrip('/')}/{filenode.name}"))
+
+        folders.sort(key=itemgetter(0))
+        self.sizes = [size for size, _ in folders]
+        self.paths = [path for _, path in folders]
+        self.prefix_sums = [0] + list(accumulate(self.sizes))
+
+    def get_sum_size_above_threshold(self, threshold: int = 100000) -> int:
+        """ Computes the sum of all the folders that have a size strictly below a given threshold """
+        return self.prefix_sums[bisect_left(self.sizes, threshold)]
+
+    def find_smallest_at_least(self, min_size: int):
+        """ Returns the (path, size) of the smallest folder with a size equal or above min_size (None if there is none) """
+        idx = bisect_left(self.sizes, min_size)
+
+        if idx == len(self.sizes):
+            return None
+
+        return self.paths[idx], self.sizes[idx]
+
+    def find_smallest_to_delete(self, total_available_space: int = TOTAL_AVAILABLE_SPACE, required_space: int = REQUIRED_SPACE):
+        """ Finds the (path, size) of the smallest directory to delete in order to free enough space """
+        unused_space = total_available_space - self.root_size
+        return self.find_smallest_at_least(required_space - unused_space)
+
     
 class Instr:
     """ Class that represents an instruction (= a string)"""
@@ -184,6 +252,8 @@ class Parser:
         self.instr_lst = instr_lst
         self.line_idx = -1
         self.current_instr = None
+        # True while reading the listing of a folder that has already been listed
+        self.skip_listing = False
 
         if instr_lst:
             self.load_instr(self.instr_lst)
@@ -208,7 +278,12 @@ class Parser:
         """ Reads the instructions, parses them and extends the Hierarchy """
         while self.new_line():
             if self.current_instr.is_command():
+                self.skip_listing = False
+
                 if self.current_instr.get_command_type() == CommandType.LS:
+                    # Do not add the content of an already listed folder a second time
+                    self.skip_listing = hierarchy.current_root.listed
+                    hierarchy.current_root.listed = True
                     continue
 
                 elif self.current_instr.get_command_type() == CommandType.CD:
@@ -222,7 +297,7 @@ class Parser:
                         hierarchy.current_root = hierarchy.find_folder_from_current(self.current_instr.get_name())
                         
 
-            else:
+            elif not self.skip_listing:
                 if self.current_instr.is_dir():
                     hierarchy.add_to_folder(Folder(self.current_instr.get_name()))
 
@@ -232,6 +307,236 @@ class Parser:
 
 
 
+class ArrayHierarchy:
+    """
+        Compact alternative to Hierarchy for very big filesystems: the nodes are stored in parallel typed arrays
+        (parent index, size, is_dir, interned name id) instead of one object per node. Node 0 is the root
+    """
+    def __init__(self):
+        self.parents = array("q", [-1])
+        self.sizes = array("q", [0])
+        self.is_dir = array("b", [1])
+        self.name_ids = array("l", [0])
+        # Interned names (the same name is stored only once)
+        self.names = [b"/"]
+        self.name_to_id = {b"/": 0}
+        # Index of the subfolders: (parent index << 32 | name id) -> node index
+        self.subfolders = {}
+        # Folders whose content has already been listed (ls)
+        self.listed = set()
+
+    def intern(self, name: bytes) -> int:
+        """ Returns the id of a name, adding it to the names table if needed """
+        name_id = self.name_to_id.get(name)
+
+        if name_id is None:
+            name_id = self.name_to_id[name] = len(self.names)
+            self.names.append(name)
+
+        return name_id
+
+    def add_node(self, parent: int, name: bytes, size: int, is_dir: bool) -> int:
+        """ Adds a node to the arrays and returns its index """
+        idx = len(self.parents)
+        name_id = self.intern(name)
+
+        self.parents.append(parent)
+        self.sizes.append(size)
+        self.is_dir.append(is_dir)
+        self.name_ids.append(name_id)
+
+        if is_dir:
+            self.subfolders[parent << 32 | name_id] = idx
+
+        return idx
+
+    def read_instrs(self, input_file) -> None:
+        """ Streams the terminal log from a binary file, fills the arrays and computes the folders sizes """
+        current = 0
+        skip_listing = False
+
+        for line in input_file:
+            splitted = line.split()
+
+            if not splitted:
+                continue
+
+            if splitted[0] == b"$":
+                skip_listing = False
+
+                if splitted[1] == b"ls":
+                    # Do not add the content of an already listed folder a second time
+                    skip_listing = current in self.listed
+                    self.listed.add(current)
+
+                elif splitted[2] == b"/":
+                    current = 0
+
+                elif splitted[2] == b"..":
+                    current = self.parents[current]
+
+                else:
+                    current = self.subfolders[current << 32 | self.name_to_id[splitted[2]]]
+
+            elif not skip_listing:
+                if splitted[0] == b"dir":
+                    self.add_node(current, splitted[1], 0, True)
+
+                else:
+                    self.add_node(current, splitted[1], int(splitted[0]), False)
+
+        self.compute_all_sizes()
+
+    def compute_all_sizes(self) -> None:
+        """ Computes the folders sizes: children always come after their parent, so a single reversed pass is enough """
+        parents, sizes, is_dir = self.parents, self.sizes, self.is_dir
+
+        for idx in range(len(parents) - 1, 0, -1):
+            if is_dir[idx]:
+                sizes[idx] = 0
+
+        for idx in range(len(parents) - 1, 0, -1):
+            sizes[parents[idx]] += sizes[idx]
+
+    def get_path(self, idx: int) -> str:
+        """ Returns the full path of a node """
+        parts = []
+
+        while idx > 0:
+            parts.append(self.names[self.name_ids[idx]].decode())
+            idx = self.parents[idx]
+
+        return "/" + "/".join(reversed(parts))
+
+    def folder_indexes(self):
+        """ Iterates over the indexes of all the folders """
+        return (idx for idx, is_dir in enumerate(self.is_dir) if is_dir)
+
+    def get_sum_size_above_threshold(self, threshold: int = 100000) -> int:
+        """ Computes the sum of all the folders that have a size strictly below a given threshold (same as Hierarchy) """
+        return sum(self.sizes[idx] for idx in self.folder_indexes() if self.sizes[idx] < threshold)
+
+    def find_smallest_to_delete(self, total_available_space: int = TOTAL_AVAILABLE_SPACE, required_space: int = REQUIRED_SPACE):
+        """ Finds the smallest directory to delete in order to free enough space, as (path, size) """
+        unused_space = total_available_space - self.sizes[0]
+        min_space_to_free = required_space - unused_space
+
+        candidates = [idx for idx in self.folder_indexes() if self.sizes[idx] >= min_space_to_free]
+        idx = min(candidates, key=self.sizes.__getitem__)
+
+        return self.get_path(idx), self.sizes[idx]
+
+    def save(self, file_name: str, source_hash: bytes) -> None:
+        """
+            Saves the hierarchy in a binary snapshot: header, then the parents, sizes, name ids (int64)
+            and is_dir (int8) arrays, then the names table (one name per line).
+            Written in a temporary file first, so a crash never leaves a partial snapshot
+        """
+        names = b"\n".join(self.names)
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sys.byteorder == "little",
+                                      source_hash, len(self.parents), len(names))
+        temp_name = f"{file_name}.{os.getpid()}.tmp"
+
+        try:
+            with open(temp_name, "wb") as output:
+                output.write(header.ljust(SNAPSHOT_OFFSET, b"\0"))
+                output.write(array("q", self.parents).tobytes())
+                output.write(array("q", self.sizes).tobytes())
+                output.write(array("q", self.name_ids).tobytes())
+                output.write(array("b", self.is_dir).tobytes())
+                output.write(names)
+
+            os.replace(temp_name, file_name)
+
+        finally:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+
+
+class SnapshotHierarchy:
+    """
+        Read-only (query only) hierarchy memory-mapped from a binary snapshot saved by ArrayHierarchy.save:
+        the arrays are not copied, and the names table is only decoded when a name is needed
+    """
+    def __init__(self, mapped: mmap.mmap, nb_nodes: int, names_len: int):
+        self.mapped = mapped
+        view = memoryview(mapped)
+        offset = SNAPSHOT_OFFSET
+        arrays = []
+
+        for item_size, typecode in ((8, "q"), (8, "q"), (8, "q"), (1, "b")):
+            arrays.append(view[offset:offset + nb_nodes * item_size].cast(typecode))
+            offset += nb_nodes * item_size
+
+        self.parents, self.sizes, self.name_ids, self.is_dir = arrays
+        self.names_view = view[offset:offset + names_len]
+
+    @cached_property
+    def names(self) -> List[bytes]:
+        """ Names table, decoded on first use """
+        return bytes(self.names_view).split(b"\n")
+
+    # Same queries as an ArrayHierarchy
+    get_path = ArrayHierarchy.get_path
+    folder_indexes = ArrayHierarchy.folder_indexes
+    get_sum_size_above_threshold = ArrayHierarchy.get_sum_size_above_threshold
+    find_smallest_to_delete = ArrayHierarchy.find_smallest_to_delete
+
+    @classmethod
+    def load(cls, file_name: str, source_hash: bytes = None):
+        """
+            Loads a binary snapshot by memory-mapping it. Returns None if the snapshot does not exist,
+            is truncated or corrupted, or was made from a different source
+        """
+        if not os.path.exists(file_name) or os.path.getsize(file_name) < SNAPSHOT_OFFSET:
+            return None
+
+        with open(file_name, "rb") as input_file:
+            mapped = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, little_endian, saved_hash, nb_nodes, names_len = SNAPSHOT_HEADER.unpack_from(mapped)
+
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or little_endian != (sys.byteorder == "little") \
+           or (source_hash is not None and saved_hash != source_hash) \
+           or len(mapped) != SNAPSHOT_OFFSET + nb_nodes * SNAPSHOT_NODE_SIZE + names_len:
+            mapped.close()
+            return None
+
+        return cls(mapped, nb_nodes, names_len)
+
+
+def file_hash(file_name: str) -> bytes:
+    """ Returns the sha256 digest of a file """
+    digest = hashlib.sha256()
+
+    with open(file_name, "rb") as input_file:
+        for block in iter(lambda: input_file.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.digest()
+
+
+def load_array_hierarchy(file_name: str = "data.txt", snapshot_name: str = None):
+    """
+        Loads the snapshot of a terminal log if it is up to date (read-only SnapshotHierarchy),
+        otherwise parses the log in an ArrayHierarchy and saves a new snapshot
+    """
+    snapshot_name = snapshot_name or file_name + ".snapshot"
+    source_hash = file_hash(file_name)
+
+    hierarchy = SnapshotHierarchy.load(snapshot_name, source_hash)
+
+    if hierarchy is None:
+        hierarchy = ArrayHierarchy()
+
+        with open(file_name, "rb") as input_file:
+            hierarchy.read_instrs(input_file)
+
+        hierarchy.save(snapshot_name, source_hash)
+
+    return hierarchy
+
+
 def load_and_format_data():
     """ Loads the data in one big string """
     with open("data.txt", "r") as input_file:
@@ -239,13 +544,20 @@ def load_and_format_data():
 
     return content
 
+def main_compact():
+    hierarchy = load_array_hierarchy("data.txt")
+
+    print(f"Sum of all directories with a size inferior to 10000: {hierarchy.get_sum_size_above_threshold()}")
+
+    folder_to_delete = hierarchy.find_smallest_to_delete()
+    print(f"Smallest directory size to delete to free enough space: {folder_to_delete[0]} = {folder_to_delete[1]}")
+
 def main():
     data = load_and_format_data()
     parser = Parser(data)
     hierarchy = Hierarchy()
     parser.read_instrs(hierarchy)
 
-    hierarchy.compute_all_sizes()
     print(f"Sum of all directories with a size inferior to 10000: {hierarchy.get_sum_size_above_threshold()}")
     
     folder_to_delete = hierarchy.find_smallest_to_delete()
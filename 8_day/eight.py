@@ -1,5 +1,14 @@
-from typing import List
+from typing import List, Tuple
 from functools import reduce
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class TreeMap:
     """ Class that stores the initial tree map, and a visited trees one """
@@ -56,6 +65,50 @@ class TreeMap:
 
         return total_sum
 
+    def compute_visible_trees_sweep(self) -> int:
+        """
+            Computes the total number of visible trees without any rotation: one running max sweep
+            per direction on the rows and columns, marking a single visibility map (O(rows x cols))
+        """
+        tree_map = self.initial_map
+        nb_rows = len(tree_map)
+        nb_cols = len(tree_map[0]) if nb_rows else 0
+        visible = [bytearray(nb_cols) for _ in range(nb_rows)]
+
+        for y in range(nb_rows):
+            line = tree_map[y]
+
+            # From the left
+            highest = -1
+            for x in range(nb_cols):
+                if line[x] > highest:
+                    visible[y][x] = 1
+                    highest = line[x]
+
+            # From the right
+            highest = -1
+            for x in range(nb_cols - 1, -1, -1):
+                if line[x] > highest:
+                    visible[y][x] = 1
+                    highest = line[x]
+
+        for x in range(nb_cols):
+            # From the top
+            highest = -1
+            for y in range(nb_rows):
+                if tree_map[y][x] > highest:
+                    visible[y][x] = 1
+                    highest = tree_map[y][x]
+
+            # From the bottom
+            highest = -1
+            for y in range(nb_rows - 1, -1, -1):
+                if tree_map[y][x] > highest:
+                    visible[y][x] = 1
+                    highest = tree_map[y][x]
+
+        return sum(sum(line) for line in visible)
+
     def compute_scenic_score(self, x: int, y: int) -> int:
         """ Computes the scenic score of a tree """
         # Compute right
@@ -125,6 +178,69 @@ class TreeMap:
 
         return highest_score
     
+    @staticmethod
+    def viewing_distances(line: List, reverse: bool = False) -> List:
+        """
+            Computes the viewing distance of every tree of a line towards its start (or its end if reverse),
+            with a monotonic stack of the trees that can still block the view (O(len(line)))
+        """
+        size = len(line)
+        distances = [0] * size
+        stack = []
+        indexes = range(size - 1, -1, -1) if reverse else range(size)
+
+        for i in indexes:
+            # Smaller trees are hidden by the current one for all the next trees
+            while stack and line[stack[-1]] < line[i]:
+                stack.pop()
+
+            if stack:
+                distances[i] = abs(i - stack[-1])
+            else:
+                distances[i] = size - 1 - i if reverse else i
+
+            stack.append(i)
+
+        return distances
+
+    def compute_all_scenic_scores(self) -> Tuple[List, Tuple[int, int]]:
+        """
+            Computes the scenic score of every tree in O(rows x cols), and returns the scores matrix (one array per row)
+            and the (x, y) coordinates of the highest score
+        """
+        return self.scenic_scores(self.initial_map)
+
+    @classmethod
+    def scenic_scores(cls, tree_map: List) -> Tuple[List, Tuple[int, int]]:
+        """ Computes the scenic scores of a map stored as a list of lists (see compute_all_scenic_scores) """
+        nb_rows = len(tree_map)
+        nb_cols = len(tree_map[0]) if nb_rows else 0
+        scores = []
+
+        for line in tree_map:
+            left = cls.viewing_distances(line)
+            right = cls.viewing_distances(line, reverse=True)
+            scores.append(array("q", [l * r for l, r in zip(left, right)]))
+
+        for x in range(nb_cols):
+            column = [tree_map[y][x] for y in range(nb_rows)]
+            up = cls.viewing_distances(column)
+            down = cls.viewing_distances(column, reverse=True)
+
+            for y in range(nb_rows):
+                scores[y][x] *= up[y] * down[y]
+
+        best = (0, 0)
+        highest_score = -1
+        for y, line in enumerate(scores):
+            line_max = max(line, default=-1)
+
+            if line_max > highest_score:
+                highest_score = line_max
+                best = (line.index(line_max), y)
+
+        return scores, best
+
     def pretty_print(self):
         """ Prints the matrix """
         for i in range(len(self.initial_map)):
@@ -133,6 +249,193 @@ class TreeMap:
             print("")
 
 
+class ArrayTreeMap(TreeMap):
+    """ TreeMap backed by a 2D uint8 numpy array, with vectorized computations """
+    def __init__(self, initial_map) -> None:
+        self.initial_map = initial_map
+        self.already_visible = np.zeros(initial_map.shape, dtype=bool)
+
+    @staticmethod
+    def visible_from_start(tree_map):
+        """ Trees visible from the start of each row: higher than the running max of the previous trees """
+        highest_before = np.full(tree_map.shape, -1, dtype=np.int16)
+        highest_before[:, 1:] = np.maximum.accumulate(tree_map, axis=1)[:, :-1]
+
+        return tree_map > highest_before
+
+    def compute_all_visible_trees(self) -> int:
+        """ Computes the total number of visible trees, from the four directions (flips and transpositions are views, no copies) """
+        tree_map = self.initial_map
+
+        self.already_visible = self.visible_from_start(tree_map) \
+            | self.visible_from_start(tree_map[:, ::-1])[:, ::-1] \
+            | self.visible_from_start(tree_map.T).T \
+            | self.visible_from_start(tree_map.T[:, ::-1])[:, ::-1].T
+
+        return int(np.count_nonzero(self.already_visible))
+
+    def compute_visible_trees_sweep(self) -> int:
+        """ Same as compute_all_visible_trees """
+        return self.compute_all_visible_trees()
+
+    def compute_all_scenic_scores(self) -> Tuple[List, Tuple[int, int]]:
+        """
+            Computes the full scenic scores matrix on the map converted to lists (much faster than on numpy scalars).
+            Needs a full int64 matrix: use compute_highest_scenic_score when only the highest score is needed
+        """
+        return self.scenic_scores(self.initial_map.tolist())
+
+    @staticmethod
+    def distances_to_start(line, heights):
+        """
+            Viewing distances towards the start of a line: distance to the closest previous tree at least as high,
+            found with a running max of its index for each of the 10 possible heights
+        """
+        positions = np.arange(len(line))
+        # Index of the last tree of height >= h up to each position (0 if none: the distance is then to the edge)
+        last_higher = np.maximum.accumulate(np.where(line >= heights, positions, 0), axis=1)
+        before = np.zeros(len(line), dtype=np.int64)
+        before[1:] = last_higher[line[1:], positions[:-1]]
+
+        return positions - before
+
+    def compute_highest_scenic_score(self) -> int:
+        """
+            Computes the highest scenic score without any full size score matrix: the down distances are kept
+            in a uint16 (or uint32) matrix during a bottom-up sweep, the other ones are computed row by row
+        """
+        tree_map = self.initial_map
+        nb_rows, nb_cols = tree_map.shape
+        heights = np.arange(10)[:, None]
+        columns = np.arange(nb_cols)
+        down = np.empty(tree_map.shape, dtype=np.uint16 if max(tree_map.shape) < 1 << 16 else np.uint32)
+
+        # Closest row below with a tree of height >= h, for each height and column (the edge if none)
+        closest = np.full((10, nb_cols), nb_rows - 1, dtype=np.int64)
+        for y in range(nb_rows - 1, -1, -1):
+            line = tree_map[y]
+            down[y] = closest[line, columns] - y
+            closest[heights <= line] = y
+
+        # Closest row above with a tree of height >= h (the edge if none)
+        closest[:] = 0
+        highest_score = 0
+        for y in range(nb_rows):
+            line = tree_map[y]
+            up = y - closest[line, columns]
+            closest[heights <= line] = y
+
+            left = self.distances_to_start(line, heights)
+            right = self.distances_to_start(line[::-1], heights)[::-1]
+            highest_score = max(highest_score, int((left * right * up * down[y]).max(initial=0)))
+
+        return highest_score
+
+
+def process_band(args) -> None:
+    """
+        Worker for tiled_analysis: computes the visibility and the viewing distances of a band of rows
+        (horizontal pass, axis 0) or of columns (vertical pass, axis 1) directly in the shared memory grids
+    """
+    names, shape, axis, start, end = args
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+
+    try:
+        grid = np.ndarray(shape, dtype=np.uint8, buffer=blocks[0].buf)
+        visible = np.ndarray(shape, dtype=bool, buffer=blocks[1].buf)
+        scores = np.ndarray(shape, dtype=np.int64, buffer=blocks[2].buf)
+
+        # Columns are handled as the rows of the transposed views
+        if axis == 1:
+            grid, visible, scores = grid.T, visible.T, scores.T
+
+        band = grid[start:end]
+        visible[start:end] |= ArrayTreeMap.visible_from_start(band) \
+            | ArrayTreeMap.visible_from_start(band[:, ::-1])[:, ::-1]
+
+        for i, line in enumerate(band.tolist(), start):
+            distances = [a * b for a, b in zip(TreeMap.viewing_distances(line), TreeMap.viewing_distances(line, reverse=True))]
+
+            if axis == 0:
+                scores[i] = distances
+            else:
+                scores[i] *= distances
+
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def tiled_analysis(grid, nb_workers: int = None) -> Tuple[int, int, Tuple[int, int]]:
+    """
+        Computes the number of visible trees and the highest scenic score (and its (x, y) coordinates)
+        of a uint8 grid with a pool of processes. The grid and the results are stored in shared memory,
+        the workers first get bands of rows (horizontal pass), then bands of columns (vertical pass)
+    """
+    nb_workers = nb_workers or os.cpu_count() or 1
+    shape = grid.shape
+    blocks = [shared_memory.SharedMemory(create=True, size=max(grid.size * item_size, 1)) for item_size in (1, 1, 8)]
+
+    try:
+        shared_grid = np.ndarray(shape, dtype=np.uint8, buffer=blocks[0].buf)
+        shared_grid[:] = grid
+        visible = np.ndarray(shape, dtype=bool, buffer=blocks[1].buf)
+        visible[:] = False
+        scores = np.ndarray(shape, dtype=np.int64, buffer=blocks[2].buf)
+
+        names = [block.name for block in blocks]
+
+        with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+            for axis in (0, 1):
+                size = shape[axis]
+                band_size = max(-(-size // nb_workers), 1)
+                tasks = [(names, shape, axis, start, min(start + band_size, size)) for start in range(0, size, band_size)]
+
+                # The vertical pass needs all the horizontal scores
+                list(executor.map(process_band, tasks))
+
+        if not grid.size:
+            return 0, 0, (0, 0)
+
+        y, x = np.unravel_index(np.argmax(scores), shape)
+
+        return int(np.count_nonzero(visible)), int(scores[y, x]), (int(x), int(y))
+
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def load_as_array(file_name: str = "data.txt"):
+    """ Loads the data in a 2D uint8 numpy array, directly from the bytes of the file """
+    if np is None:
+        raise ImportError("The numpy backend requires numpy to be installed")
+
+    with open(file_name, "rb") as input_file:
+        content = input_file.read().replace(b"\r", b"").strip(b"\n")
+
+    width = content.find(b"\n")
+    if width == -1:
+        width = len(content)
+
+    # Every line must have the same width: the line breaks are exactly every width + 1 bytes
+    raw = np.frombuffer(content, dtype=np.uint8)
+    line_breaks = np.flatnonzero(raw == ord("\n"))
+    nb_lines = len(line_breaks) + 1
+
+    if len(content) != (width + 1) * nb_lines - 1 \
+       or not np.array_equal(line_breaks, np.arange(1, nb_lines) * (width + 1) - 1):
+        raise ValueError(f"All the lines of {file_name} must have the same width ({width})")
+
+    grid = np.frombuffer(content.replace(b"\n", b""), dtype=np.uint8) - ord("0")
+
+    # Bytes that are not digits wrap around in the uint8 subtraction
+    if grid.size and grid.max() > 9:
+        raise ValueError(f"{file_name} must only contain digits")
+
+    return grid.reshape(nb_lines, width)
+
 def test_rotation(tree_map: TreeMap) -> None:
     """ Testing the matrix rotation """
     tree_map.pretty_print()
@@ -155,11 +458,27 @@ def load_and_format_data():
         
     return data
 
-def main():
-    data = load_and_format_data()
-    tree_map = TreeMap(data)
-    print(f"Number of all visible trees: {tree_map.compute_all_visible_trees()}")
-    print(f"Highest scenic score is: {tree_map.compute_highest_scenic_score()}")
+def main(engine="rotations"):
+    if engine == "rotations":
+        tree_map = TreeMap(load_and_format_data())
+        print(f"Number of all visible trees: {tree_map.compute_all_visible_trees()}")
+        print(f"Highest scenic score is: {tree_map.compute_highest_scenic_score()}")
+
+    elif engine == "sweep":
+        tree_map = TreeMap(load_and_format_data())
+        print(f"Number of all visible trees: {tree_map.compute_visible_trees_sweep()}")
+        scores, (x, y) = tree_map.compute_all_scenic_scores()
+        print(f"Highest scenic score is: {scores[y][x]}")
+
+    elif engine == "numpy":
+        tree_map = ArrayTreeMap(load_as_array())
+        print(f"Number of all visible trees: {tree_map.compute_all_visible_trees()}")
+        print(f"Highest scenic score is: {tree_map.compute_highest_scenic_score()}")
+
+    elif engine == "tiled":
+        nb_visible, highest_score, _ = tiled_analysis(load_as_array())
+        print(f"Number of all visible trees: {nb_visible}")
+        print(f"Highest scenic score is: {highest_score}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file